@@ -1,13 +1,31 @@
+import json
 import os
-import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
-from typing import Any, Dict, List
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional
 
-import pandas as pd
+import httpx
+
+from db_sqlite import open_ro, prepare_db, to_date_day
 
 # If you're using OpenAI API:
-from openai import OpenAI  # official SDK
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from openai import DefaultHttpxClient, OpenAI  # official SDK
+
+# One pooled client for the whole process; keep-alive connections are reused across calls.
+client = OpenAI(
+    api_key=os.getenv("OPENAI_API_KEY"),
+    max_retries=2,
+    # Reasoning models can take minutes on a full report; keep the SDK's 600s read budget
+    timeout=httpx.Timeout(600.0, connect=10.0),
+    http_client=DefaultHttpxClient(
+        limits=httpx.Limits(max_connections=16, max_keepalive_connections=8),
+    ),
+)
+
+REPORT_MODEL = "gpt-5"  # choose your preferred model
+MAX_PARALLEL_REPORTS = 8
 
 
 @dataclass
@@ -17,88 +35,75 @@ class YearContext:
 
 
 def load_year_metrics(db_path: str, year: int) -> Dict[str, Any]:
-    conn = sqlite3.connect(db_path)
+    # Read-only: callers run prepare_db(db_path) once beforehand.
+    conn = open_ro(db_path)
 
-    # Only spending (amount_cents < 0). Stored as negative cents; convert to positive dollars in queries.
-    total = pd.read_sql(
-        """
-        SELECT
-          SUM(CASE WHEN amount_cents < 0 THEN -amount_cents ELSE 0 END) AS spend_cents,
-          COUNT(*) AS txn_count
-        FROM transactions
-        WHERE substr(transaction_date, 1, 4) = ?
-        """,
-        conn,
-        params=(str(year),),
-    ).iloc[0].to_dict()
+    # Monthly and category rollups come from the materialized summary tables
+    # (spend already in positive cents), keyed by month.
+    # Results are tiny, so read them with plain cursors rather than DataFrames.
+    month_range = (f"{year}-01", f"{year + 1}-01")
 
-    by_month = pd.read_sql(
+    by_month = conn.execute(
         """
-        SELECT
-          substr(transaction_date, 1, 7) AS month,
-          SUM(CASE WHEN amount_cents < 0 THEN -amount_cents ELSE 0 END) AS spend_cents
-        FROM transactions
-        WHERE substr(transaction_date, 1, 4) = ?
-        GROUP BY month
+        SELECT month, spend_cents, txn_count
+        FROM mv_monthly_summary
+        WHERE month >= ? AND month < ?
         ORDER BY month
         """,
-        conn,
-        params=(str(year),),
-    )
+        month_range,
+    ).fetchall()
 
-    by_category = pd.read_sql(
+    by_category = conn.execute(
         """
-        SELECT
-          COALESCE(category_final, category_chase, 'Uncategorized') AS category,
-          SUM(CASE WHEN amount_cents < 0 THEN -amount_cents ELSE 0 END) AS spend_cents
-        FROM transactions
-        WHERE substr(transaction_date, 1, 4) = ?
+        SELECT category, SUM(spend_cents) AS spend_cents
+        FROM mv_monthly_category
+        WHERE month >= ? AND month < ?
         GROUP BY category
         ORDER BY spend_cents DESC
         """,
-        conn,
-        params=(str(year),),
-    )
+        month_range,
+    ).fetchall()
 
-    by_merchant = pd.read_sql(
+    # Merchants are not summarized; query transactions with an integer date_day range.
+    # Only spending (amount_cents < 0). Stored as negative cents; convert to positive dollars in queries.
+    by_merchant = conn.execute(
         """
         SELECT
           m.name AS merchant,
           SUM(CASE WHEN t.amount_cents < 0 THEN -t.amount_cents ELSE 0 END) AS spend_cents
         FROM transactions t
         JOIN merchants m ON t.merchant_id = m.id
-        WHERE substr(t.transaction_date, 1, 4) = ?
+        WHERE t.date_day >= ? AND t.date_day < ?
         GROUP BY m.name
         ORDER BY spend_cents DESC
         LIMIT 15
         """,
-        conn,
-        params=(str(year),),
-    )
+        (to_date_day(date(year, 1, 1)), to_date_day(date(year + 1, 1, 1))),
+    ).fetchall()
 
     conn.close()
 
-    # Convert to dollars (float for reporting only)
-    def cents_to_dollars(df: pd.DataFrame, col: str) -> pd.DataFrame:
-        out = df.copy()
-        out[col] = (out[col] / 100.0).round(2)
-        return out
+    # Year totals from the monthly rows (at most 12), no extra round trip
+    spend_cents = sum(c for _, c, _ in by_month)
+    txn_count = sum(n for _, _, n in by_month)
 
-    total_spend = round((total["spend_cents"] or 0) / 100.0, 2)
+    # Convert to dollars (float for reporting only)
+    def cents_to_dollars(cents: int | None) -> float:
+        return round((cents or 0) / 100.0, 2)
 
     return {
         "year": year,
-        "total_spend": total_spend,
-        "txn_count": int(total["txn_count"] or 0),
-        "by_month": cents_to_dollars(by_month, "spend_cents").rename(columns={"spend_cents": "spend"}),
-        "by_category": cents_to_dollars(by_category, "spend_cents").rename(columns={"spend_cents": "spend"}),
-        "top_merchants": cents_to_dollars(by_merchant, "spend_cents").rename(columns={"spend_cents": "spend"}),
+        "total_spend": cents_to_dollars(spend_cents),
+        "txn_count": int(txn_count or 0),
+        "by_month": [{"month": m, "spend": cents_to_dollars(c)} for m, c, _ in by_month],
+        "by_category": [{"category": k, "spend": cents_to_dollars(c)} for k, c in by_category],
+        "top_merchants": [{"merchant": k, "spend": cents_to_dollars(c)} for k, c in by_merchant],
     }
 
 def build_prompt(metrics: Dict[str, Any]) -> str:
-    by_month = metrics["by_month"].to_dict(orient="records")
-    by_category = metrics["by_category"].head(12).to_dict(orient="records")
-    top_merchants = metrics["top_merchants"].to_dict(orient="records")
+    by_month = metrics["by_month"]
+    by_category = metrics["by_category"][:12]
+    top_merchants = metrics["top_merchants"]
 
     return f"""
 You are a personal finance analyst.
@@ -138,26 +143,179 @@ def generate_year_end_report(metrics: Dict[str, Any]) -> str:
     prompt = build_prompt(metrics)
 
     response = client.responses.create(
-        model="gpt-5",   # choose your preferred model
+        model=REPORT_MODEL,
         input=prompt,
     )
 
     return response.output_text
 
+
+def generate_year_end_reports(
+    metrics_list: List[Dict[str, Any]],
+    on_report: Optional[Callable[[int, str], None]] = None,
+) -> Dict[int, str]:
+    """
+    Generate several year-end reports in parallel over the shared client.
+    on_report(year, report) is called as each report finishes, so one failed
+    year does not discard the others. Returns {year: report} in metrics_list
+    order; raises RuntimeError listing the failed years after all others finish.
+    """
+    if not metrics_list:
+        return {}
+
+    finished: Dict[int, str] = {}
+    failures: Dict[int, Exception] = {}
+
+    workers = min(MAX_PARALLEL_REPORTS, len(metrics_list))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(generate_year_end_report, m): m["year"] for m in metrics_list}
+        for future in as_completed(futures):
+            year = futures[future]
+            try:
+                report = future.result()
+            except Exception as err:
+                failures[year] = err
+                continue
+            finished[year] = report
+            if on_report:
+                on_report(year, report)
+
+    if failures:
+        details = "; ".join(f"{year}: {err!r}" for year, err in sorted(failures.items()))
+        raise RuntimeError(f"Report generation failed for years {sorted(failures)}: {details}")
+
+    return {m["year"]: finished[m["year"]] for m in metrics_list}
+
+
+def _response_output_text(body: Dict[str, Any]) -> str:
+    """
+    Concatenate the output_text parts of a raw Responses API body
+    (the SDK's response.output_text, for JSON read back from a batch file).
+    """
+    return "".join(
+        part["text"]
+        for item in body.get("output", [])
+        if item.get("type") == "message"
+        for part in item.get("content", [])
+        if part.get("type") == "output_text"
+    )
+
+
+def generate_year_end_reports_batch(
+    metrics_list: List[Dict[str, Any]],
+    poll_interval: float = 60,
+) -> List[str]:
+    """
+    Generate reports through the OpenAI Batch API.
+    Cheaper than online requests and not subject to the online rate limit,
+    but results can take up to 24h. Returned in the same order as metrics_list.
+    """
+    if not metrics_list:
+        return []
+
+    years = [m["year"] for m in metrics_list]
+    if len(set(years)) != len(years):
+        # custom_id must be unique; the API would only reject it after the upload
+        raise ValueError(f"Duplicate years in batch: {years}")
+
+    lines = [
+        json.dumps({
+            "custom_id": f"year-{m['year']}",
+            "method": "POST",
+            "url": "/v1/responses",
+            "body": {"model": REPORT_MODEL, "input": build_prompt(m)},
+        })
+        for m in metrics_list
+    ]
+    batch_input = client.files.create(
+        file=("batchinput.jsonl", "\n".join(lines).encode("utf-8")),
+        purpose="batch",
+    )
+
+    batch = client.batches.create(
+        input_file_id=batch_input.id,
+        endpoint="/v1/responses",
+        completion_window="24h",
+    )
+    while batch.status not in ("completed", "failed", "expired", "cancelled"):
+        time.sleep(poll_interval)
+        batch = client.batches.retrieve(batch.id)
+
+    # Failed requests land in the error file (and sometimes as non-200 output lines)
+    error_text = client.files.content(batch.error_file_id).text if batch.error_file_id else ""
+
+    if batch.status != "completed" or not batch.output_file_id:
+        raise RuntimeError(
+            f"Batch {batch.id} finished with status {batch.status!r}"
+            + (f"; errors: {error_text.strip()}" if error_text.strip() else "")
+        )
+
+    reports: Dict[str, str] = {}
+    errors: Dict[str, Any] = {}
+    output_text = client.files.content(batch.output_file_id).text
+    for line in (output_text + "\n" + error_text).splitlines():
+        if not line.strip():
+            continue
+        result = json.loads(line)
+        response = result.get("response") or {}
+        if response.get("status_code") == 200:
+            reports[result["custom_id"]] = _response_output_text(response["body"])
+        else:
+            errors[result["custom_id"]] = (
+                result.get("error")
+                or (response.get("body") or {}).get("error")
+                or f"status {response.get('status_code')}"
+            )
+
+    missing = [m["year"] for m in metrics_list if f"year-{m['year']}" not in reports]
+    if missing:
+        details = "; ".join(
+            f"{year}: {errors.get(f'year-{year}', 'no result line')}" for year in missing
+        )
+        raise RuntimeError(f"Batch {batch.id} returned no report for years {missing}: {details}")
+
+    return [reports[f"year-{m['year']}"] for m in metrics_list]
+
 if __name__ == "__main__":
     import argparse
 
     parser = argparse.ArgumentParser()
     parser.add_argument("--db", default="budget.db")
-    parser.add_argument("--year", type=int, required=True)
-    parser.add_argument("--out", default=None, help="Optional path to save report as .md")
+    parser.add_argument("--year", type=int, nargs="+", required=True)
+    parser.add_argument(
+        "--out",
+        default=None,
+        help="Optional path to save report as .md; include {year} when passing several years",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help=(
+            "Submit through the OpenAI Batch API: about 50%% cheaper and not capped by the "
+            "online rate limit, but results may take up to 24h. Best for offline backfills."
+        ),
+    )
     args = parser.parse_args()
 
-    metrics = load_year_metrics(args.db, args.year)
-    report = generate_year_end_report(metrics)
+    # Repeated years would duplicate work (and batch custom_ids)
+    years = list(dict.fromkeys(args.year))
+
+    if args.out and len(years) > 1 and "{year}" not in args.out:
+        parser.error("--out must contain {year} when passing several years")
+
+    def emit(year: int, report: str) -> None:
+        print(report)
 
-    print(report)
+        if args.out:
+            with open(args.out.format(year=year), "w", encoding="utf-8") as f:
+                f.write(report)
 
-    if args.out:
-        with open(args.out, "w", encoding="utf-8") as f:
-            f.write(report)
+    prepare_db(args.db)
+    metrics_list = [load_year_metrics(args.db, year) for year in years]
+    if args.batch:
+        reports = generate_year_end_reports_batch(metrics_list)
+        for year, report in zip(years, reports):
+            emit(year, report)
+    else:
+        # Each report is printed/written as soon as it finishes
+        generate_year_end_reports(metrics_list, on_report=emit)
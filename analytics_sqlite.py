@@ -1,20 +1,76 @@
-import sqlite3
 import pandas as pd
 
-from main import plot_monthly_spend_plotly, plot_monthly_category_breakdown_plotly
+from db_sqlite import open_ro, prepare_db
+from plot_utils import plot_monthly_spend_plotly, plot_monthly_category_breakdown_plotly
 
 DB_PATH = "budget.db"
+TOP_N = 10
+
+# Top TOP_N categories per month plus one "Other" row per month for the rest,
+# ranked with a window function so pandas only receives the small result.
+TOP_N_CATEGORY_CTE = """
+WITH ranked AS (
+  SELECT
+    month, category, spend_cents, txn_count,
+    ROW_NUMBER() OVER (PARTITION BY month ORDER BY spend_cents DESC, category) AS rk
+  FROM mv_monthly_category
+  WHERE spend_cents > 0
+),
+top_n AS (
+  SELECT month, category, spend_cents, txn_count
+  FROM ranked
+  WHERE rk <= :top_n
+  UNION ALL
+  SELECT month, 'Other' AS category, SUM(spend_cents), SUM(txn_count)
+  FROM ranked
+  WHERE rk > :top_n
+  GROUP BY month
+)
+"""
 
 def main():
-    conn = sqlite3.connect(DB_PATH)
+    prepare_db(DB_PATH)
+    conn = open_ro(DB_PATH)
 
-    monthly = pd.read_sql("SELECT * FROM v_monthly_summary ORDER BY month", conn)
-    category = pd.read_sql("SELECT * FROM v_monthly_category ORDER BY month, spend DESC", conn)
+    monthly = pd.read_sql(
+        """
+        SELECT month, spend_cents / 100.0 AS total_spend, txn_count
+        FROM mv_monthly_summary
+        ORDER BY month
+        """,
+        conn,
+        dtype_backend="pyarrow",
+    )
+    category = pd.read_sql(
+        TOP_N_CATEGORY_CTE
+        + """
+        SELECT month, category, spend_cents / 100.0 AS spend, txn_count
+        FROM top_n
+        ORDER BY month, spend DESC
+        """,
+        conn,
+        params={"top_n": TOP_N},
+        dtype_backend="pyarrow",
+    )
+    # Stack order (largest total first), rolled up in SQL rather than pandas
+    cat_order = pd.read_sql(
+        TOP_N_CATEGORY_CTE
+        + """
+        SELECT category
+        FROM top_n
+        GROUP BY category
+        ORDER BY SUM(spend_cents) DESC
+        """,
+        conn,
+        params={"top_n": TOP_N},
+        dtype_backend="pyarrow",
+    )["category"].tolist()
 
     conn.close()
 
-    plot_monthly_spend_plotly(monthly)
-    plot_monthly_category_breakdown_plotly(category)
+    # Headless pipeline run: write HTML instead of opening a browser
+    plot_monthly_spend_plotly(monthly, render="html")
+    plot_monthly_category_breakdown_plotly(category, cat_order=cat_order, render="html")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,260 @@
+import sqlite3
+from contextlib import contextmanager
+from datetime import date
+from pathlib import Path
+
+# julianday() of a date's midnight is ordinal + 1721424.5; date_day stores the integer part.
+_JULIAN_DAY_OFFSET = 1721424
+
+# Spend is stored as negative cents; summaries keep it as positive cents.
+_SPEND_EXPR = "CASE WHEN {row}.amount_cents < 0 THEN -{row}.amount_cents ELSE 0 END"
+_MONTH_EXPR = "substr({row}.transaction_date, 1, 7)"
+_CATEGORY_EXPR = "COALESCE({row}.category_final, {row}.category_chase, 'Uncategorized')"
+
+
+def prepare_db(db_path: str) -> None:
+    """
+    One writable connection to apply file-level settings and migrations.
+    WAL is persistent in the file, so readers opened with open_ro benefit too.
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        ensure_schema(conn)
+    finally:
+        conn.close()
+
+
+def open_ro(db_path: str) -> sqlite3.Connection:
+    """
+    Read-only connection tuned for analytics scans: 64MB page cache,
+    256MB mmap and in-memory temp tables (for GROUP BY / ORDER BY b-trees).
+    """
+    # as_uri() percent-encodes the path, so "?", "#" and "%" in it stay literal
+    conn = sqlite3.connect(Path(db_path).resolve().as_uri() + "?mode=ro", uri=True)
+    conn.execute("PRAGMA cache_size=-65536")
+    conn.execute("PRAGMA mmap_size=268435456")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+
+@contextmanager
+def _immediate_transaction(conn: sqlite3.Connection):
+    """
+    Explicit BEGIN IMMEDIATE ... COMMIT. Python's legacy sqlite3 transaction
+    handling autocommits DDL, so `with conn:` does not make DDL + backfill atomic.
+    """
+    conn.commit()
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+    finally:
+        conn.isolation_level = isolation_level
+
+
+def ensure_schema(conn: sqlite3.Connection) -> None:
+    """
+    Bring the database up to date for the report queries. Safe to run on every startup.
+    """
+    ensure_date_day(conn)
+    ensure_indexes(conn)
+    ensure_summary_tables(conn)
+
+
+def to_date_day(d: date) -> int:
+    """
+    Integer day number matching transactions.date_day for d.
+    """
+    return d.toordinal() + _JULIAN_DAY_OFFSET
+
+
+def ensure_date_day(conn: sqlite3.Connection) -> None:
+    """
+    Add transactions.date_day: the transaction date as an integer Julian day,
+    so date filters are integer range scans instead of string comparisons.
+
+    A VIRTUAL generated column (SQLite 3.31+): nothing to backfill or keep in
+    sync, and inserts pay no extra write; the index on it stores the values.
+    date() drops any time of day first: Julian days start at noon, so an
+    afternoon timestamp would otherwise land on the next day.
+    """
+    cols = {row[1] for row in conn.execute("PRAGMA table_xinfo(transactions)")}
+    if "date_day" not in cols:
+        conn.execute(
+            """
+            ALTER TABLE transactions ADD COLUMN date_day INTEGER
+            GENERATED ALWAYS AS (CAST(julianday(date(transaction_date)) AS INTEGER)) VIRTUAL
+            """
+        )
+        conn.commit()
+
+
+def ensure_indexes(conn: sqlite3.Connection) -> None:
+    """
+    Create the indexes the report queries rely on.
+    """
+    # Index for the yearly merchant query: the date_day range seeks on it.
+    # date_day is a virtual column, so the index is what stores its values.
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_tx_day_merchant_amt "
+        "ON transactions(date_day, merchant_id, amount_cents)"
+    )
+    conn.commit()
+
+
+def _upsert_deltas(row: str, sign: str) -> str:
+    """
+    Trigger body statements that add (sign "") or remove (sign "-") one
+    transaction row from both summary tables.
+    """
+    month = _MONTH_EXPR.format(row=row)
+    category = _CATEGORY_EXPR.format(row=row)
+    spend = _SPEND_EXPR.format(row=row)
+    return f"""
+      INSERT INTO mv_monthly_summary(month, spend_cents, txn_count)
+      VALUES ({month}, {sign}({spend}), {sign}1)
+      ON CONFLICT(month) DO UPDATE SET
+        spend_cents = spend_cents + excluded.spend_cents,
+        txn_count = txn_count + excluded.txn_count;
+      INSERT INTO mv_monthly_category(month, category, spend_cents, txn_count)
+      VALUES ({month}, {category}, {sign}({spend}), {sign}1)
+      ON CONFLICT(month, category) DO UPDATE SET
+        spend_cents = spend_cents + excluded.spend_cents,
+        txn_count = txn_count + excluded.txn_count;
+    """
+
+
+def _prune_empty(row: str) -> str:
+    """
+    Trigger body statements that drop the row's summary entries once their
+    count reaches zero. Keyed on the primary keys, so each is a single lookup.
+    """
+    month = _MONTH_EXPR.format(row=row)
+    category = _CATEGORY_EXPR.format(row=row)
+    return f"""
+      DELETE FROM mv_monthly_summary
+      WHERE month = {month} AND txn_count = 0;
+      DELETE FROM mv_monthly_category
+      WHERE month = {month} AND category = {category} AND txn_count = 0;
+    """
+
+
+def ensure_summary_tables(conn: sqlite3.Connection) -> None:
+    """
+    Materialized monthly summaries, kept current by triggers on transactions.
+
+    mv_monthly_summary:  month -> spend_cents, txn_count
+    mv_monthly_category: (month, category) -> spend_cents, txn_count
+
+    spend_cents counts only spending (debits); txn_count counts every row.
+    Tables are populated from transactions the first time they are created,
+    and rebuilt when their row count no longer matches transactions.
+
+    Every writer that uses INSERT OR REPLACE on transactions must run
+    PRAGMA recursive_triggers=ON on its own connection (the setting is
+    per connection). Without it the replaced row is deleted without firing
+    trg_tx_mv_delete and the summaries double count until the next rebuild.
+    Prefer INSERT OR IGNORE or an upsert for idempotent ingest.
+    """
+    triggers = [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_tx_mv_insert AFTER INSERT ON transactions
+        BEGIN
+          {_upsert_deltas("NEW", "")}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_tx_mv_delete AFTER DELETE ON transactions
+        BEGIN
+          {_upsert_deltas("OLD", "-")}
+          {_prune_empty("OLD")}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_tx_mv_update
+        AFTER UPDATE OF transaction_date, amount_cents, category_final, category_chase
+        ON transactions
+        BEGIN
+          {_upsert_deltas("OLD", "-")}
+          {_upsert_deltas("NEW", "")}
+          {_prune_empty("OLD")}
+          {_prune_empty("NEW")}
+        END
+        """,
+    ]
+
+    # Create, backfill and attach triggers in one transaction so no insert is missed
+    # and an interrupted backfill leaves no empty tables behind.
+    with _immediate_transaction(conn):
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'mv_monthly_summary'"
+        ).fetchone()
+        if exists:
+            # Cheap drift check (e.g. a writer used REPLACE without recursive_triggers)
+            summarized = conn.execute(
+                "SELECT COALESCE(SUM(txn_count), 0) FROM mv_monthly_summary"
+            ).fetchone()[0]
+            actual = conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+            if summarized != actual:
+                conn.execute("DELETE FROM mv_monthly_summary")
+                conn.execute("DELETE FROM mv_monthly_category")
+                _backfill_summaries(conn)
+        else:
+            conn.execute(
+                """
+                CREATE TABLE mv_monthly_summary (
+                  month TEXT PRIMARY KEY,
+                  spend_cents INTEGER NOT NULL,
+                  txn_count INTEGER NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE mv_monthly_category (
+                  month TEXT NOT NULL,
+                  category TEXT NOT NULL,
+                  spend_cents INTEGER NOT NULL,
+                  txn_count INTEGER NOT NULL,
+                  PRIMARY KEY (month, category)
+                )
+                """
+            )
+            _backfill_summaries(conn)
+        for sql in triggers:
+            conn.execute(sql)
+
+
+def _backfill_summaries(conn: sqlite3.Connection) -> None:
+    """
+    Populate both (empty) summary tables from transactions.
+    """
+    conn.execute(
+        f"""
+        INSERT INTO mv_monthly_summary(month, spend_cents, txn_count)
+        SELECT {_MONTH_EXPR.format(row="t")} AS month,
+               SUM({_SPEND_EXPR.format(row="t")}),
+               COUNT(*)
+        FROM transactions t
+        GROUP BY month
+        """
+    )
+    conn.execute(
+        f"""
+        INSERT INTO mv_monthly_category(month, category, spend_cents, txn_count)
+        SELECT {_MONTH_EXPR.format(row="t")} AS month,
+               {_CATEGORY_EXPR.format(row="t")} AS category,
+               SUM({_SPEND_EXPR.format(row="t")}),
+               COUNT(*)
+        FROM transactions t
+        GROUP BY month, category
+        """
+    )
@@ -1,16 +1,11 @@
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import sqlite3
 from pathlib import Path
-from decimal import Decimal
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly import plot_monthly_spend_plotly, plot_monthly_category_breakdown_plotly
 
+from plot_utils import plot_monthly_spend_plotly, plot_monthly_category_breakdown_plotly
 
-def load_chase_statement(csv_path: str, card_name: str | None = None) -> pd.DataFrame:
-    df = pd.read_csv(csv_path)
 
+def load_chase_statement(csv_path: str, card_name: str | None = None) -> pd.DataFrame:
     expected_cols = {
         "Transaction Date",
         "Post Date",
@@ -20,28 +15,59 @@ def load_chase_statement(csv_path: str, card_name: str | None = None) -> pd.Data
         "Amount",
         "Memo",
     }
-    missing = expected_cols - set(df.columns)
+    # Header-only read so a bad file fails here, before any typed parsing
+    missing = expected_cols - set(pd.read_csv(csv_path, nrows=0).columns)
     if missing:
         raise ValueError(f"Missing columns: {missing}")
 
-    df["transaction_date"] = pd.to_datetime(df["Transaction Date"])
-    df["post_date"] = pd.to_datetime(df["Post Date"])
+    # Schema applied while reading: one pass, no re-casts.
+    # Arrow-backed columns keep strings in one UTF-8 buffer and use Arrow compute kernels.
+    df = pd.read_csv(
+        csv_path,
+        dtype={
+            "Transaction Date": "string[pyarrow]",
+            "Post Date": "string[pyarrow]",
+            "Description": "string[pyarrow]",
+            "Category": "string[pyarrow]",
+            "Type": "string[pyarrow]",
+            "Memo": "string[pyarrow]",
+            "Amount": "float64[pyarrow]",
+        },
+        dtype_backend="pyarrow",
+    )
+
+    # Chase exports MM/DD/YYYY; an explicit format parses in one vectorized pass
+    for src, dest in (("Transaction Date", "transaction_date"), ("Post Date", "post_date")):
+        try:
+            df[dest] = pd.to_datetime(df[src], format="%m/%d/%Y")
+        except ValueError as err:
+            raise ValueError(f"{src}: expected MM/DD/YYYY dates (Chase export format)") from err
 
-    df["amount"] = df["Amount"].apply(lambda x: Decimal(str(x)))
+    # A blank Amount would cast to an int64 garbage value below, so reject it here
+    blank_amount = df["Amount"].isna()
+    if blank_amount.any():
+        raise ValueError(f"Missing Amount in rows: {df.index[blank_amount].tolist()}")
 
-    df["merchant"] = df["Description"].astype(str).str.upper().str.strip()
-    df["category"] = df["Category"].fillna("Uncategorized").astype(str).str.strip()
+    # Money as integer cents (vectorized; no per-row Decimal objects)
+    df["amount_cents"] = np.rint(df["Amount"].to_numpy(dtype=np.float64) * 100).astype(np.int64)
+
+    df["merchant"] = df["Description"].str.upper().str.strip()
+    df["category"] = df["Category"].fillna("Uncategorized").str.strip()
 
     # Derived fields
-    df["month"] = df["transaction_date"].dt.to_period("M").astype(str)
+    df["month"] = df["transaction_date"].dt.strftime("%Y-%m")
     df["year"] = df["transaction_date"].dt.year
-    df["is_credit"] = df["amount"] > 0
+    df["is_credit"] = df["amount_cents"] > 0
 
     if card_name:
         df["card"] = card_name
 
     # Optional: normalize Type
-    df["type"] = df["Type"].astype(str).str.strip()
+    df["type"] = df["Type"].str.strip()
+
+    # Low-cardinality text: category dtype so groupbys hash integer codes, not strings
+    for col in ("merchant", "category", "type"):
+        df[col] = df[col].astype("category")
 
     # Keep only useful columns (you can add more back if you want)
     cols = [
@@ -51,7 +77,7 @@ def load_chase_statement(csv_path: str, card_name: str | None = None) -> pd.Data
         "merchant",
         "category",
         "type",
-        "amount",
+        "amount_cents",
         "is_credit",
         "Memo",
     ]
@@ -69,174 +95,107 @@ def monthly_spend_summary(
     Monthly rollup. By default, counts only spending (debits),
     excluding payments/refunds/credits.
     """
-    df = txns.copy()
-
+    df = txns
     if not include_credits:
-        df = df[df["amount"] < 0]
+        df = txns.loc[txns["amount_cents"] < 0]
 
     summary = (
-        df.groupby("month", as_index=False)
+        df.groupby("month", as_index=False, observed=True, sort=False)
           .agg(
-              total_spend=("amount", lambda s: sum(s) * Decimal('-1')),  # make positive
-              txn_count=("amount", "size"),
+              total_spend=("amount_cents", "sum"),
+              txn_count=("amount_cents", "size"),
           )
           .sort_values("month")
     )
+    summary["total_spend"] = -summary["total_spend"]  # make positive
     # Calculate average cost per transaction
-    summary["avg_per_transaction"] = summary.apply(
-        lambda row: row["total_spend"] / row["txn_count"], axis=1
-    )
+    summary["avg_per_transaction"] = summary["total_spend"] / summary["txn_count"]
     return summary
 
 
 def monthly_category_breakdown(txns: pd.DataFrame, top_n: int | None = None) -> pd.DataFrame:
-    df = txns[txns["amount"] < 0].copy()
+    df = txns.loc[txns["amount_cents"] < 0]
 
     breakdown = (
-        df.groupby(["month", "category"], as_index=False)
+        df.groupby(["month", "category"], as_index=False, observed=True, sort=False)
           .agg(
-              spend=("amount", lambda s: sum(s) * Decimal('-1')),
-              txn_count=("amount", "size"),
+              spend=("amount_cents", "sum"),
+              txn_count=("amount_cents", "size"),
           )
-          .sort_values(["month", "spend"], ascending=[True, False])
     )
+    breakdown["spend"] = -breakdown["spend"]  # make positive
+    breakdown = breakdown.sort_values(["month", "spend"], ascending=[True, False])
 
     # Calculate average spending per transaction
-    breakdown["avg_per_transaction"] = breakdown.apply(
-        lambda row: row["spend"] / row["txn_count"], axis=1
-    )
+    breakdown["avg_per_transaction"] = breakdown["spend"] / breakdown["txn_count"]
 
     if top_n is None:
         return breakdown
 
-    # Rank categories within each month by spend
-    breakdown["rank_in_month"] = breakdown.groupby("month")["spend"].rank(
-        method="first", ascending=False
-    )
-
-    top = breakdown[breakdown["rank_in_month"] <= top_n].copy()
-    rest = breakdown[breakdown["rank_in_month"] > top_n].copy()
+    # breakdown is sorted by (month, spend desc), so the first top_n rows of each month are its top categories
+    top = breakdown.groupby("month", observed=True, sort=False).head(top_n)
+    rest = breakdown.drop(index=top.index)
 
     if not rest.empty:
         other = (
-            rest.groupby("month", as_index=False)
+            rest.groupby("month", as_index=False, observed=True, sort=False)
                 .agg(
-                    spend=("spend", lambda s: sum(s)),
+                    spend=("spend", "sum"),
                     txn_count=("txn_count", "sum")
                 )
         )
         other["category"] = "Other"
         # Calculate average for "Other" category
-        other["avg_per_transaction"] = other.apply(
-            lambda row: row["spend"] / row["txn_count"], axis=1
-        )
-        top = pd.concat([top.drop(columns=["rank_in_month"]), other], ignore_index=True)
-    else:
-        top = top.drop(columns=["rank_in_month"])
-
-    return top.sort_values(["month", "spend"], ascending=[True, False]).reset_index(drop=True)
-
-
-def save_df(df: pd.DataFrame, output_path: str) -> None:
+        other["avg_per_transaction"] = other["spend"] / other["txn_count"]
+        # top and other are both in month order, so each month's "Other" row goes
+        # right after that month's last top row: one np.insert per column, no concat or sort
+        insert_at = np.searchsorted(top["month"].to_numpy(), other["month"].to_numpy(), side="right")
+        top = pd.DataFrame({
+            col: np.insert(top[col].to_numpy(), insert_at, other[col].to_numpy())
+            for col in top.columns
+        })
+
+    return top.reset_index(drop=True)
+
+
+def save_df(
+    df: pd.DataFrame,
+    output_path: str,
+    *,
+    chunksize: int = 50_000,
+    compress: bool = False,
+) -> str:
+    """
+    Write df as CSV, serializing chunksize rows at a time.
+    With compress=True the file is gzipped and ".gz" is appended to the path.
+    Returns the path written.
+    """
+    if compress and not output_path.endswith(".gz"):
+        output_path += ".gz"
     Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-    df.to_csv(output_path, index=False)
+    df.to_csv(
+        output_path,
+        index=False,
+        chunksize=chunksize,
+        compression="gzip" if compress else None,
+        float_format="%.2f",
+    )
+    return output_path
 
 def format_money_columns(df: pd.DataFrame, cols: list[str]) -> pd.DataFrame:
     """
-    Format monetary columns to two decimal places.
-    Uses Decimal.quantize for precise rounding.
+    Convert integer-cent monetary columns to dollars with two decimal places.
+    Rounds half away from zero (like Decimal ROUND_HALF_UP), vectorized.
+    Call this only right before writing output.
     """
-    from decimal import ROUND_HALF_UP
     df = df.copy()
     for col in cols:
         if col in df.columns:
-            df[col] = df[col].apply(
-                lambda x: Decimal(str(x)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-                if isinstance(x, (Decimal, int, float)) else x
-            )
+            cents = df[col].to_numpy(dtype=np.float64)
+            df[col] = np.sign(cents) * np.floor(np.abs(cents) + 0.5) / 100
     return df
 
 
-# def plot_monthly_spend_plotly(monthly_df: pd.DataFrame) -> None:
-#     """
-#     Interactive bar chart: total spend per month.
-#     Expects columns: month, total_spend (Decimal or numeric)
-#     """
-#     df = monthly_df.copy()
-#     df["total_spend"] = df["total_spend"].astype(float)  # Decimal -> float for plotting
-
-#     fig = px.bar(
-#         df,
-#         x="month",
-#         y="total_spend",
-#         hover_data={"month": True, "total_spend": ":$,.2f"},
-#         title="Monthly Spending",
-#     )
-
-#     fig.update_traces(textposition="outside", cliponaxis=False)
-#     fig.update_layout(
-#         xaxis_title="Month",
-#         yaxis_title="Total Spend ($)",
-#         yaxis_tickprefix="$",
-#         yaxis_tickformat=",.2f",
-#         hovermode="x",
-#         margin=dict(t=60, r=30, b=60, l=60),
-#     )
-
-#     fig.show()
-
-
-# def plot_monthly_category_breakdown_plotly(breakdown_df: pd.DataFrame) -> None:
-#     """
-#     Interactive stacked bar chart: spend by category per month.
-#     Hover shows month + category + spend.
-#     Expects columns: month, category, spend (Decimal or numeric)
-#     """
-#     df = breakdown_df.copy()
-#     df["category"] = df["category"].astype(str).str.strip()
-#     df["spend"] = df["spend"].astype(float)  # Decimal -> float for plotting
-
-#     # Aggregate just in case (month, category) appears more than once
-#     df = (
-#         df.groupby(["month", "category"], as_index=False)
-#           .agg(spend=("spend", "sum"))
-#     )
-
-#     # Order categories so biggest spenders are at the bottom of the stack
-#     cat_order = (
-#         df.groupby("category")["spend"]
-#           .sum()
-#           .sort_values(ascending=False)
-#           .index
-#           .tolist()
-#     )
-#     df["category"] = pd.Categorical(df["category"], categories=cat_order, ordered=True)
-
-#     fig = px.bar(
-#         df,
-#         x="month",
-#         y="spend",
-#         color="category",
-#         barmode="stack",
-#         title="Monthly Spending by Category (Hover for details)",
-#         hover_data={"month": True, "category": True, "spend": ":$,.2f"},
-#     )
-
-#     fig.update_layout(
-#         xaxis_title="Month",
-#         yaxis_title="Spend ($)",
-#         yaxis_tickprefix="$",
-#         yaxis_tickformat=",.2f",
-#         hovermode="x",
-#         legend_title_text="Category",
-#         margin=dict(t=60, r=30, b=60, l=60),
-#     )
-
-#     fig.show()
-
-
-
-
 if __name__ == "__main__":
     input_csv = "data/chase_statement.csv"
 
@@ -246,19 +205,17 @@ if __name__ == "__main__":
     breakdown = monthly_category_breakdown(txns, top_n=10)
 
     # 🔹 Round money columns
-    txns = format_money_columns(txns, ["amount"])
     monthly = format_money_columns(monthly, ["total_spend", "avg_per_transaction"])
     breakdown = format_money_columns(breakdown, ["spend", "avg_per_transaction"])
 
-    conn = sqlite3.connect("budget.db")
-
-    monthly = pd.read_sql("SELECT * FROM v_monthly_summary", conn)
-    category = pd.read_sql("SELECT * FROM v_monthly_category_breakdown", conn)
-
     plot_monthly_spend_plotly(monthly)
     plot_monthly_category_breakdown_plotly(breakdown)
 
-    save_df(txns, "output/transactions_clean.csv")
+    # Whole cents divide exactly; save_df's float_format prints two decimals
+    save_df(
+        txns.rename(columns={"amount_cents": "amount"}).assign(amount=lambda d: d["amount"] / 100),
+        "output/transactions_clean.csv",
+        compress=True,
+    )
     save_df(monthly, "output/monthly_summary.csv")
     save_df(breakdown, "output/monthly_category_breakdown.csv")
-
@@ -0,0 +1,119 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+
+def _render(fig: go.Figure, render: str, html_path: str) -> None:
+    """
+    render="show" opens the figure in a browser; render="html" writes a small
+    HTML fragment (plotly.js loaded from CDN) for headless runs.
+    """
+    fig.update_layout(uirevision="const")
+    if render == "html":
+        Path(html_path).parent.mkdir(parents=True, exist_ok=True)
+        fig.write_html(html_path, include_plotlyjs="cdn", full_html=False)
+    elif render == "show":
+        fig.show()
+    else:
+        raise ValueError(f"Unknown render mode: {render!r}")
+
+
+def plot_monthly_spend_plotly(
+    monthly_df: pd.DataFrame,
+    render: str = "show",
+    html_path: str = "output/monthly_spend.html",
+) -> None:
+    """
+    Interactive bar chart: total spend per month.
+    Expects columns: month, total_spend (Decimal or numeric)
+    """
+    # Render boundary: plain numpy arrays for Plotly (inputs may be Arrow-backed or Decimal)
+    month = monthly_df["month"].to_numpy(dtype=object)
+    total_spend = monthly_df["total_spend"].to_numpy(dtype=np.float64)
+
+    # Plain go.Bar: a single trace does not need px's dataframe introspection
+    fig = go.Figure(
+        go.Bar(
+            x=month,
+            y=total_spend,
+            hovertemplate="month=%{x}<br>total_spend=%{y:$,.2f}<extra></extra>",
+            textposition="outside",
+            cliponaxis=False,
+        )
+    )
+
+    fig.update_layout(
+        title="Monthly Spending",
+        xaxis_title="Month",
+        yaxis_title="Total Spend ($)",
+        yaxis_tickprefix="$",
+        yaxis_tickformat=",.2f",
+        hovermode="x",
+        margin=dict(t=60, r=30, b=60, l=60),
+    )
+
+    _render(fig, render, html_path)
+
+
+def plot_monthly_category_breakdown_plotly(
+    breakdown_df: pd.DataFrame,
+    cat_order: list[str] | None = None,
+    render: str = "show",
+    html_path: str = "output/monthly_category_breakdown.html",
+) -> None:
+    """
+    Interactive stacked bar chart: spend by category per month.
+    Hover shows month + category + spend.
+    Expects columns: month, category, spend (Decimal or numeric)
+    Pass cat_order (largest first) when breakdown_df is already one row per
+    (month, category), e.g. rolled up in SQL, to skip the pandas aggregation.
+    """
+    # Only the plotted columns, as plain numpy arrays for Plotly
+    # (inputs may be Arrow-backed, categorical or Decimal)
+    df = pd.DataFrame({
+        "month": breakdown_df["month"].to_numpy(dtype=object),
+        "category": breakdown_df["category"].to_numpy(dtype=object),
+        "spend": breakdown_df["spend"].to_numpy(dtype=np.float64),
+    })
+
+    if cat_order is None:
+        # Aggregate just in case (month, category) appears more than once
+        df = (
+            df.groupby(["month", "category"], as_index=False, observed=True, sort=False)
+              .agg(spend=("spend", "sum"))
+        )
+
+        # Order categories so biggest spenders are at the bottom of the stack
+        cat_order = (
+            df.groupby("category", observed=True, sort=False)["spend"]
+              .sum()
+              .sort_values(ascending=False)
+              .index
+              .tolist()
+        )
+    df["category"] = pd.Categorical(df["category"], categories=cat_order, ordered=True)
+
+    fig = px.bar(
+        df,
+        x="month",
+        y="spend",
+        color="category",
+        barmode="stack",
+        title="Monthly Spending by Category (Hover for details)",
+        hover_data={"month": True, "category": True, "spend": ":$,.2f"},
+    )
+
+    fig.update_layout(
+        xaxis_title="Month",
+        yaxis_title="Spend ($)",
+        yaxis_tickprefix="$",
+        yaxis_tickformat=",.2f",
+        hovermode="x",
+        legend_title_text="Category",
+        margin=dict(t=60, r=30, b=60, l=60),
+    )
+
+    _render(fig, render, html_path)